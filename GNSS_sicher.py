@@ -3,18 +3,34 @@ import os
 import time
 import serial
 import csv
-import tempfile
+import logging
+import logging.handlers
+import queue
+import shutil
+import sys
+import threading
+from itertools import islice
 from dotenv import load_dotenv
 from pathlib import Path
 from datetime import datetime
 import psycopg2
+from psycopg2.extras import execute_batch, execute_values
+from psycopg2.pool import SimpleConnectionPool
 
 # -------------------------
 # Globale Variablen
 # -------------------------
 ser = None
+db_pool = None
 db = None
 cursor = None
+last_speed = None                # zuletzt aus RMC gelesene Geschwindigkeit
+row_queue = None                 # Reader → Writer (queue.Queue)
+stop_event = threading.Event()   # beendet den Writer-Thread
+buffer_lock = threading.RLock()  # schützt BUFFER_FILE (Reader + Writer)
+buf_fh = None                    # dauerhaft offener Append-Handle auf BUFFER_FILE
+buf_dirty = False                # ungesyncte Zeilen im Append-Handle
+last_buf_sync = 0.0
 
 # -------------------------
 # .env laden & prüfen
@@ -26,7 +42,17 @@ load_dotenv(dotenv_path=env_path)
 
 SERIAL_PORT = os.getenv("SERIAL_PORT", "/dev/serial0")
 BAUD_RATE   = int(os.getenv("BAUD_RATE", "9600"))
+# u-blox: diese NMEA-Sätze beim Start abschalten (leer = Empfänger nicht anfassen)
+NMEA_DISABLE = [m for m in os.getenv("NMEA_DISABLE", "GSV,GSA,GLL,VTG,ZDA,TXT").split(",") if m]
+# Baudrate, auf die der Empfänger per PUBX,41 umgestellt wird (Default: unverändert)
+RECEIVER_BAUD_RATE = int(os.getenv("RECEIVER_BAUD_RATE", str(BAUD_RATE)))
 BUFFER_FILE = "buffer.csv"
+FLUSH_FILE  = BUFFER_FILE + ".flush"  # beiseite gelegter Puffer während des Nachtragens
+# copy = COPY + Multi-Row-INSERT, values = nur Multi-Row-INSERT,
+# batch = Einzel-INSERTs gebündelt (z. B. wenn Trigger Multi-Row verbieten).
+# Live-Zeilen gehen bei copy/values als Multi-Row-INSERT, bei batch einzeln.
+FLUSH_MODE  = os.getenv("FLUSH_MODE", "copy")
+DEBUG       = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
 
 DB_HOST     = os.getenv("DB_HOST")
 DB_PORT     = os.getenv("DB_PORT", "5432")
@@ -34,41 +60,85 @@ DB_NAME     = os.getenv("DB_NAME")
 DB_USER     = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+FLUSH_CHUNK     = 512   # Zeilen pro Nachtrag-Commit (Multi-Row-INSERT)
+BATCH_PAGE_SIZE = 500   # Statements pro Roundtrip im batch-Modus
+QUEUE_SIZE      = 1000  # max. Zeilen zwischen Reader und Writer
+WRITE_BATCH     = 200   # Live-Commit spätestens nach so vielen Zeilen …
+COMMIT_INTERVAL = 2.0   # … oder nach so vielen Sekunden
+BUFFER_SYNC_INTERVAL = 5.0  # Puffer-Datei spätestens alle x Sekunden fsyncen
+KN_TO_KMH = 1.852  # Knoten → km/h
+_INV60    = 1 / 60.0  # Bogenminuten → Grad
+ROW_FMT = "{},{},{},{},{}\n"  # timestamp,lat,lon,alt,speed – leer = NULL
+
+# Statische SQL-Texte einmal als bytes – psycopg2 muss sie nicht pro Aufruf encoden
+_INS_VALUES_SQL = (b"INSERT INTO gnss_data (timestamp, latitude, longitude, altitude, speed) "
+                   b"VALUES %s")
+_INS_ROW_SQL = (b"INSERT INTO gnss_data (timestamp, latitude, longitude, altitude, speed) "
+                b"VALUES (%s,%s,%s,%s,%s)")
+
+# -------------------------
+# Logging
+# -------------------------
+# Log-Zeilen sammeln und gebündelt ausgeben statt ein write() pro Satz.
+# Ab WARNING sofort – auch wenn der Writer-Thread an der DB hängt –, sonst
+# spätestens wenn der Writer-Thread flusht.
+_stream_handler = logging.StreamHandler(sys.stdout)  # wie vorher print()
+_stream_handler.setFormatter(logging.Formatter(
+    "%(asctime)s %(levelname)s  %(message)s", datefmt="%H:%M:%S"))
+log_handler = logging.handlers.MemoryHandler(
+    1000, flushLevel=logging.WARNING, target=_stream_handler)
+log = logging.getLogger("gnss")
+log.addHandler(log_handler)
+log.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
 for var in ("DB_HOST", "DB_NAME", "DB_USER", "DB_PASSWORD"):
     if not globals()[var]:
         raise RuntimeError(f"Environment variable {var} is not set in .env")
+if FLUSH_MODE not in ("copy", "values", "batch"):
+    raise RuntimeError(f"FLUSH_MODE must be copy, values or batch, not {FLUSH_MODE!r}")
 
 # -------------------------
 # Hilfsfunktionen
 # -------------------------
 def connect_db():
     """(Re)connect to the database and flush any buffered rows."""
-    global db, cursor
-    try:
-        if db:
-            db.close()
-    except:
-        pass
-    db = psycopg2.connect(
-        host=DB_HOST, port=DB_PORT, dbname=DB_NAME,
-        user=DB_USER, password=DB_PASSWORD, sslmode="require"
-    )
+    global db_pool, db, cursor
+    if db_pool is None:
+        # TCP-Keepalives erkennen halb-offene Verbindungen ohne vollen Reconnect
+        db_pool = SimpleConnectionPool(
+            1, 2,
+            host=DB_HOST, port=DB_PORT, dbname=DB_NAME,
+            user=DB_USER, password=DB_PASSWORD, sslmode="require",
+            keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3,
+            connect_timeout=10
+        )
+    if db is not None:
+        try:
+            db_pool.putconn(db, close=True)
+        except Exception:
+            pass
+        db = cursor = None
+    db = db_pool.getconn()
+    db.autocommit = False
     cursor = db.cursor()
-    print("🔄 (Re)connected to DB")
+    # COMMIT wartet nicht auf den WAL-fsync. Bei einem Server-Crash können bis
+    # zu 3× wal_writer_delay (Default 200 ms → ~600 ms) an bereits bestätigten
+    # Commits verloren gehen – vertretbar für GNSS-Punkte. Ohne sofortigen
+    # Commit würde ein späterer Rollback das SET wieder zurücknehmen.
+    cursor.execute("SET synchronous_commit = off")
+    db.commit()
+    log.info("🔄 (Re)connected to DB")
     flush_buffer_to_db()
 
-def convert_to_decimal(raw: str, direction: str):
+def convert_to_decimal(raw: bytes, direction: bytes):
     if not raw or not direction:
         return None
-    deg  = int(float(raw) / 100)
-    minu = float(raw) - deg * 100
-    dec  = deg + minu / 60.0
-    if direction in ("S", "W"):
-        dec = -dec
-    return dec
-
-def parse_gpgga(line: str):
-    parts = line.split(",")
+    deg, minu = divmod(float(raw), 100.0)
+    dec = deg + minu * _INV60
+    return -dec if direction in (b"S", b"W") else dec
+
+def parse_gpgga(line: bytes):
+    parts = line.split(b",", 10)  # nur Felder 0–9 werden gebraucht
     if len(parts) < 10:
         return None
     lat = convert_to_decimal(parts[2], parts[3])
@@ -79,144 +149,385 @@ def parse_gpgga(line: str):
         alt = None
     return lat, lon, alt
 
-def parse_gprmc(line: str):
-    parts = line.split(",")
-    if len(parts) < 8 or not parts[7]:
-        return None
-    speed_kn = float(parts[7])
-    return speed_kn * 1.852  # kn → km/h
+def parse_gprmc(line: bytes):
+    p = line.split(b",", 8)  # nur Felder 0–7 werden gebraucht
+    s = p[7] if len(p) > 7 else None
+    return float(s) * KN_TO_KMH if s else None
+
+def nmea_sentence(body: str) -> bytes:
+    """Frame body as $body*CS with the NMEA XOR checksum."""
+    cs = 0
+    for ch in body.encode("ascii"):
+        cs ^= ch
+    return f"${body}*{cs:02X}\r\n".encode("ascii")
+
+def configure_receiver(ser):
+    """Silence unused NMEA sentences and optionally raise the UART baud rate."""
+    for msg in NMEA_DISABLE:
+        ser.write(nmea_sentence(f"PUBX,40,{msg},0,0,0,0,0,0"))
+    if RECEIVER_BAUD_RATE != BAUD_RATE:
+        # UART1, in: UBX+NMEA+RTCM, out: UBX+NMEA
+        ser.write(nmea_sentence(f"PUBX,41,1,0007,0003,{RECEIVER_BAUD_RATE},0"))
+        ser.flush()
+        time.sleep(0.1)
+        ser.baudrate = RECEIVER_BAUD_RATE
+    ser.flush()
+    log.info("📡 Empfänger konfiguriert: %s aus, %d Baud", ", ".join(NMEA_DISABLE) or "nichts", ser.baudrate)
+
+def read_lines(ser):
+    """Yield complete lines from ser, reading whatever the UART has waiting."""
+    buf = bytearray()
+    while True:
+        buf += ser.read(max(1, ser.in_waiting))
+        while (i := buf.find(b"\n")) != -1:
+            yield bytes(buf[:i])
+            del buf[:i + 1]
+        if len(buf) > 4096:  # Müll ohne Zeilenende verwerfen
+            buf.clear()
+
+def open_buffer():
+    """Open BUFFER_FILE once for appending."""
+    global buf_fh
+    buf_fh = open(BUFFER_FILE, "a", newline="", buffering=64 * 1024)
+
+def sync_buffer(force=False):
+    """Flush and fsync BUFFER_FILE if BUFFER_SYNC_INTERVAL has passed."""
+    global buf_dirty, last_buf_sync
+    with buffer_lock:
+        if not buf_dirty or buf_fh is None or buf_fh.closed:
+            return
+        if force or time.time() - last_buf_sync >= BUFFER_SYNC_INTERVAL:
+            buf_fh.flush()
+            os.fsync(buf_fh.fileno())
+            buf_dirty = False
+            last_buf_sync = time.time()
 
 def save_to_buffer(ts, lat, lon, alt, speed):
-    """Atomically prepend a row to BUFFER_FILE."""
-    fd, tmp = tempfile.mkstemp(dir=".", prefix=BUFFER_FILE, text=True)
-    with os.fdopen(fd, "w", newline="") as f_tmp:
-        writer = csv.writer(f_tmp)
-        writer.writerow([ts.isoformat(), lat, lon, alt, speed])
-        if os.path.exists(BUFFER_FILE):
-            with open(BUFFER_FILE, "r", newline="") as f_old:
-                for row in f_old:
-                    f_tmp.write(row)
-    os.replace(tmp, BUFFER_FILE)
-    print("💾 Gespeichert im Puffer (Offline-Modus)")
+    """Append a row to BUFFER_FILE."""
+    global buf_dirty
+    with buffer_lock:
+        if buf_fh is None or buf_fh.closed:
+            open_buffer()
+        buf_fh.write(ROW_FMT.format(
+            ts,
+            "" if lat is None else f"{lat:.7f}",
+            "" if lon is None else f"{lon:.7f}",
+            "" if alt is None else f"{alt:.2f}",
+            "" if speed is None else f"{speed:.2f}"
+        ))
+        buf_dirty = True
+        sync_buffer()
+    log.debug("💾 Gespeichert im Puffer (Offline-Modus)")
 
-def flush_buffer_to_db():
-    """Try to insert all buffered rows; keep only failures."""
-    if not os.path.exists(BUFFER_FILE):
-        return
-    rows = list(csv.reader(open(BUFFER_FILE, "r", newline="")))
-    if not rows:
-        return
+def execute_insert(params, page_size):
+    """INSERT the parameter tuples in the statement form FLUSH_MODE selects."""
+    if FLUSH_MODE == "batch":
+        execute_batch(cursor, _INS_ROW_SQL, params,
+                      page_size=min(page_size, BATCH_PAGE_SIZE))
+    else:
+        execute_values(cursor, _INS_VALUES_SQL, params, page_size=page_size)
 
-    success = 0
-    failed = []
+def insert_rows(rows, page_size=FLUSH_CHUNK):
+    """Insert rows in batches; on failure halve the batch and retry.
 
-    for row in rows:
-        try:
-            cursor.execute(
-                "INSERT INTO gnss_data (timestamp, latitude, longitude, altitude, speed) "
-                "VALUES (%s,%s,%s,%s,%s)",
-                (row[0], float(row[1]), float(row[2]), float(row[3]), float(row[4]))
+    Returns the rows that could not be inserted."""
+    try:
+        execute_insert([params for _, params in rows], page_size)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if len(rows) == 1:
+            log.error("❌ Nachtrag-Fehler bei %s: %s", rows[0][0], e)
+            return rows
+        mid = len(rows) // 2
+        return (insert_rows(rows[:mid], max(1, page_size // 2))
+                + insert_rows(rows[mid:], max(1, page_size // 2)))
+    return []
+
+def copy_buffer_to_db():
+    """Stream FLUSH_FILE into gnss_data via COPY; True if it was loaded."""
+    cursor.execute("SAVEPOINT buffer_copy")
+    try:
+        with open(FLUSH_FILE, "r", newline="") as f:
+            cursor.copy_expert(
+                "COPY gnss_data (timestamp, latitude, longitude, altitude, speed) "
+                "FROM STDIN WITH CSV", f
             )
-        except Exception as e:
-            print(f"❌ Nachtrag-Fehler bei {row}: {e}")
-            failed.append(row)
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT buffer_copy")
+        log.warning("⚠️ COPY fehlgeschlagen: %s – Nachtrag zeilenweise", e)
+        return False
+    db.commit()
+    open(FLUSH_FILE, "w").close()
+    log.info("✅ %d gepufferte Datensätze per COPY nachgetragen.", cursor.rowcount)
+    return True
+
+def buffer_row_params(row):
+    """Convert a buffered CSV row to INSERT parameters; empty fields become NULL."""
+    if len(row) < 5:
+        raise ValueError(f"{len(row)} statt 5 Spalten")
+    return (row[0],) + tuple(float(v) if v else None for v in row[1:5])
+
+def buffer_line(line):
+    """End a kept buffer line with exactly one \\n – COPY rejects mixed line endings."""
+    return line.rstrip(b"\r\n") + b"\n"
+
+def flush_chunk(lines):
+    """Insert one chunk of raw buffer lines.
+
+    Returns (inserted row count, lines that failed); blank lines count as neither."""
+    batch = []
+    failed = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            # surrogateescape: kaputte Bytes (z. B. abgerissener Write) scheitern
+            # nur an dieser Zeile und landen unverändert wieder im Puffer
+            row = next(csv.reader([line.decode("utf-8", "surrogateescape")]), [])
+            params = buffer_row_params(row)
+        except (csv.Error, ValueError) as e:
+            log.error("❌ Nachtrag-Fehler bei %r: %s", line, e)
+            failed.append(line)
         else:
-            success += 1
+            batch.append((line, params))
+    inserted = 0
+    if batch:
+        rejected = insert_rows(batch)
+        inserted = len(batch) - len(rejected)
+        failed += [line for line, _ in rejected]
+    return inserted, failed
 
+def flush_buffer_to_db():
+    """Try to insert all buffered rows; keep only failures.
+
+    buffer_lock is only held while the buffer is moved aside to FLUSH_FILE
+    and while the leftovers are appended back – never during DB I/O, so
+    save_to_buffer in the reader thread cannot block on a hanging DB."""
+    with buffer_lock:
+        # Ein noch vorhandenes FLUSH_FILE (abgebrochener Versuch) zuerst abarbeiten
+        if not os.path.exists(FLUSH_FILE):
+            reopen = buf_fh is not None and not buf_fh.closed
+            if reopen:
+                buf_fh.flush()
+            if not os.path.exists(BUFFER_FILE) or os.path.getsize(BUFFER_FILE) == 0:
+                return
+            if reopen:
+                sync_buffer(force=True)
+                buf_fh.close()
+            os.replace(BUFFER_FILE, FLUSH_FILE)
+            if reopen:
+                open_buffer()
+
+    if not _flush_file():
+        connect_db()
+        return
+
+    # Übrig gebliebene Zeilen zurück in den Puffer
+    with buffer_lock:
+        if os.path.getsize(FLUSH_FILE) > 0:
+            if buf_fh is not None and not buf_fh.closed:
+                buf_fh.flush()
+            with open(FLUSH_FILE, "rb") as src, open(BUFFER_FILE, "ab") as dst:
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+        os.remove(FLUSH_FILE)
+
+def _flush_file():
+    """Insert FLUSH_FILE and leave only the lines to keep in it.
+
+    Returns False if the connection broke; FLUSH_FILE then still holds
+    every row that was not committed."""
+    try:
+        if FLUSH_MODE == "copy" and copy_buffer_to_db():
+            return True
+    except Exception as e:
+        log.warning("⚠️ Commit-Fehler: %s – Reconnecting for next attempt", e)
+        return False
+
+    # Puffer zeilenweise als bytes streamen und in Chunks committen: konstanter
+    # Speicher, Lesen kann nicht an der Dekodierung scheitern, und ein
+    # fehlerhafter Datensatz kostet nicht den ganzen Puffer. Was bleibt, wird
+    # in einer Temp-Datei daneben gesammelt, gefsynct und atomar über
+    # FLUSH_FILE geschoben – ein Stromausfall lässt immer eine ganze Datei zurück.
+    success = kept = 0
+    error = None
+    keep_file = FLUSH_FILE + ".tmp"
+    with open(FLUSH_FILE, "rb") as f, open(keep_file, "wb") as keep:
+        while chunk := list(islice(f, FLUSH_CHUNK)):
+            try:
+                inserted, failed = flush_chunk(chunk)
+            except Exception as e:
+                # Bereits committete Chunks nicht erneut nachtragen
+                error = e
+                keep.writelines(map(buffer_line, chunk))
+                keep.writelines(map(buffer_line, f))
+                break
+            keep.writelines(map(buffer_line, failed))
+            success += inserted
+            kept += len(failed)
+        keep.flush()
+        os.fsync(keep.fileno())
+    os.replace(keep_file, FLUSH_FILE)
+
+    if error:
+        log.warning("⚠️ Commit-Fehler: %s – Reconnecting for next attempt", error)
+        return False
     if success > 0:
+        log.info("✅ %d gepufferte Datensätze nachgetragen; %d verbleiben.", success, kept)
+    return True
+
+# -------------------------
+# DB-Writer-Thread
+# -------------------------
+def drain_queue():
+    """Collect up to WRITE_BATCH rows, waiting at most COMMIT_INTERVAL."""
+    batch = []
+    deadline = time.time() + COMMIT_INTERVAL
+    while len(batch) < WRITE_BATCH:
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            break
         try:
-            db.commit()
-        except Exception as e:
-            print(f"⚠️ Commit-Fehler: {e} – Reconnecting for next attempt")
+            batch.append(row_queue.get(timeout=timeout))
+        except queue.Empty:
+            break
+    return batch
+
+def write_rows(batch):
+    """Insert live rows in one commit; buffer them on failure."""
+    try:
+        if cursor is None or cursor.closed or db.closed:
             connect_db()
-            return
+        # Bewusst kein PREPARE/EXECUTE: psycopg2 spricht nur das Simple-Query-
+        # Protokoll mit Text-Parametern, binäre Parameter bräuchten psycopg 3.
+        # Ein einzelner Multi-Row-INSERT ist damit der schnellste Weg.
+        execute_insert(batch, WRITE_BATCH)
+        db.commit()
+    except Exception as e:
+        log.error("❌ Insert-Fehler: %s", e)
+        for row in batch:
+            save_to_buffer(*row)
+        connect_db()
+        return
+    log.debug("✅ %d Datensätze in DB gespeichert bis %s", len(batch), batch[-1][0])
+    flush_buffer_to_db()
+
+def writer_loop():
+    """Drain row_queue into the DB until stop_event is set and the queue is empty."""
+    last_flush = time.time()
+    while not (stop_event.is_set() and row_queue.empty()):
+        try:
+            batch = drain_queue()
+            if batch:
+                write_rows(batch)
+            sync_buffer()
+            log_handler.flush()
 
-        with open(BUFFER_FILE, "w", newline="") as f:
-            csv.writer(f).writerows(failed)
-        print(f"✅ {success} gepufferte Datensätze nachgetragen; {len(failed)} verbleiben.")
+            # Periodischer reconnect + flush alle 30 Sekunden
+            if time.time() - last_flush >= 30:
+                last_flush = time.time()
+                if cursor is None or cursor.closed or db.closed:
+                    connect_db()
+                else:
+                    cursor.execute("SELECT 1")
+                flush_buffer_to_db()
+        except Exception as e:
+            log.warning("⚠️ Writer-Fehler: %s", e)
+            time.sleep(2)
+
+# -------------------------
+# NMEA-Handler
+# -------------------------
+def handle_rmc(line: bytes):
+    """Speed aus RMC merken."""
+    global last_speed
+    speed = parse_gprmc(line)
+    if speed is not None:
+        last_speed = speed
+        log.debug("🚀 Speed aktualisiert: %.2f km/h", last_speed)
+
+def handle_gga(line: bytes):
+    """Position aus GGA an den Writer-Thread übergeben."""
+    log.debug("➡️ GGA-Zeile erkannt!")
+    data = parse_gpgga(line)
+    if not data:
+        log.warning("⚠️ Parsing fehlgeschlagen")
+        return
+    lat, lon, alt = data
+    # Erfassungszeit einmal formatieren – gilt für DB und Puffer
+    ts = datetime.utcnow().isoformat()
+    speed = last_speed if last_speed is not None else 0.0
+    log.debug("🌍 Parsed: %s, %s, %s m  🚀 %.2f km/h", lat, lon, alt, speed)
+
+    # Bei voller Queue direkt puffern
+    try:
+        row_queue.put_nowait((ts, lat, lon, alt, speed))
+    except queue.Full:
+        log.warning("⚠️ Queue voll")
+        save_to_buffer(ts, lat, lon, alt, speed)
+
+# Satztyp steht fest an Position 3–5: $GPGGA, $GNRMC, …
+HANDLERS = {b"RMC": handle_rmc, b"GGA": handle_gga}
 
 # -------------------------
 # Hauptprogramm
 # -------------------------
 if __name__ == "__main__":
-    last_speed = None
-    last_flush = time.time()
+    row_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    writer = threading.Thread(target=writer_loop, name="db-writer", daemon=True)
 
     try:
         ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-        print("✅ GNSS-Sensor verbunden!")
+        log.info("✅ GNSS-Sensor verbunden!")
+        configure_receiver(ser)
+        open_buffer()
         connect_db()
+        writer.start()
 
-        while True:
-            line = ser.readline().decode("utf-8", errors="ignore").strip()
+        for raw in read_lines(ser):
+            # Geparst wird direkt auf bytes – float() nimmt bytes ohne decode()
+            line = raw.strip()
             if not line:
                 continue
 
-            print(f"Empfangen: {line}")
-            header = line.split(",")[0]
-            print(f"[DEBUG] Header = {header}")
-
-            # Speed aus RMC
-            if header in ("$GPRMC", "$GNRMC"):
-                speed = parse_gprmc(line)
-                if speed is not None:
-                    last_speed = speed
-                    print(f"🚀 Speed aktualisiert: {last_speed:.2f} km/h")
+            log.debug("Empfangen: %s", line)
+            if len(line) < 6 or line[0:1] != b"$":
                 continue
-
-            # Position aus GGA
-            if header.endswith("GGA"):
-                print("➡️ GGA-Zeile erkannt!")
-                data = parse_gpgga(line)
-                if not data:
-                    print("⚠️ Parsing fehlgeschlagen")
-                    continue
-                lat, lon, alt = data
-                ts = datetime.utcnow()
-                speed = last_speed if last_speed is not None else 0.0
-                print(f"🌍 Parsed: {lat}, {lon}, {alt} m  🚀 {speed:.2f} km/h")
-
-                # Live-Insert mit reconnect-Check
-                try:
-                    if cursor is None or cursor.closed or db.closed:
-                        connect_db()
-                    cursor.execute(
-                        "INSERT INTO gnss_data (timestamp, latitude, longitude, altitude, speed) "
-                        "VALUES (%s,%s,%s,%s,%s)",
-                        (ts.isoformat(), lat, lon, alt, speed)
-                    )
-                    db.commit()
-                    print(f"✅ Gespeichert in DB: {ts.isoformat()}")
-                    flush_buffer_to_db()
-                except Exception as e:
-                    print(f"❌ Insert-Fehler: {e}")
-                    save_to_buffer(ts, lat, lon, alt, speed)
-                    connect_db()
-
-            # Periodischer reconnect + flush alle 30 Sekunden
-            if time.time() - last_flush >= 30:
-                try:
-                    if cursor is None or cursor.closed or db.closed:
-                        connect_db()
-                    else:
-                        cursor.execute("SELECT 1")
-                    flush_buffer_to_db()
-                except Exception as e:
-                    print(f"⚠️ Periodischer Flush/Reconnect-Fehler: {e}")
-                    connect_db()
-                last_flush = time.time()
+            handler = HANDLERS.get(line[3:6])
+            if handler is None:
+                continue
+            try:
+                handler(line)
+            except ValueError as e:
+                # UART-Rauschen in einem Zahlenfeld – Satz verwerfen, weiterlesen
+                log.warning("⚠️ Ungültiger NMEA-Satz %r: %s", line, e)
 
     except KeyboardInterrupt:
-        print("\n🛑 GNSS-Logger beendet durch Tastatur")
+        log.info("🛑 GNSS-Logger beendet durch Tastatur")
 
     except Exception as e:
-        print(f"⚠️ Unerwarteter Fehler: {e}")
+        log.error("⚠️ Unerwarteter Fehler: %s", e)
 
     finally:
-        print("\n📦 Aufräumen…")
+        log.info("📦 Aufräumen…")
+        stop_event.set()
+        if writer.is_alive():
+            writer.join(timeout=10)
+        # Was der Writer nicht mehr geschafft hat, landet im Puffer
+        while True:
+            try:
+                save_to_buffer(*row_queue.get_nowait())
+            except queue.Empty:
+                break
+        if buf_fh:
+            sync_buffer(force=True)
+            buf_fh.close()
         if ser:
             ser.close()
         if cursor:
             cursor.close()
-        if db:
-            db.close()
\ No newline at end of file
+        if db_pool:
+            db_pool.closeall()
+        logging.shutdown()